@@ -0,0 +1,114 @@
+import pathlib
+
+import pandas as pd
+
+from depot_risk_assessment.config import ETFHandler
+from depot_risk_assessment.mapping import (
+    country_mapping_ishare,
+    country_mapping_yahoo,
+    sector_mapping_yahoo,
+)
+from depot_risk_assessment.readers import get_reader
+
+ATTRIBUTION_KEYS = ["Emittententicker", "Sektor", "Standort", "wkn", "Position", "Type"]
+ATTRIBUTION_COLUMNS = [*ATTRIBUTION_KEYS, "Wert"]
+
+
+def _securities_by_isin(df: pd.DataFrame, ex_isin_info: pd.DataFrame) -> pd.DataFrame:
+    # Same harmonization as prepare_data_by_isin
+    isin = df["ISIN"].fillna(df["Name"])
+    info = ex_isin_info.drop_duplicates(subset="ISIN").set_index("ISIN")
+    standort = df["Standort"].fillna(
+        isin.map(info["Standort"]).map(country_mapping_yahoo)
+    )
+    return pd.DataFrame(
+        {
+            "Emittententicker": isin.map(info["Emittententicker"]).fillna(df["Name"]),
+            "Sektor": df["Sektor"].fillna(
+                isin.map(info["Sektor"]).map(sector_mapping_yahoo)
+            ),
+            "Standort": standort.replace(country_mapping_ishare),
+        }
+    )
+
+
+def _securities_by_ticker(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Emittententicker": df["Emittententicker"]
+            .fillna(df["Name"])
+            .str.replace(" ", "-"),
+            "Sektor": df["Sektor"],
+            "Standort": df["Standort"],
+        }
+    )
+
+
+def _final_sektor(index: pd.DataFrame, depot_merged: pd.DataFrame) -> pd.Series:
+    # ETFs of different editors can disagree on the Sektor of a security,
+    # depot_merged keeps one per security and Type
+    keys = ["Emittententicker", "Standort", "Type"]
+    final = depot_merged.groupby(keys, dropna=False, as_index=False)["Sektor"].first()
+    sektor = index[keys].merge(final, on=keys, how="left")["Sektor"]
+    return sektor.set_axis(index.index).fillna(index["Sektor"])
+
+
+def build_attribution_index(
+    etf_handler: ETFHandler,
+    ex_isin_info: pd.DataFrame,
+    depot: pd.DataFrame,
+    depot_merged: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """Build the security x position index in long (sparse) format.
+
+    Every row is one non zero (security, wkn) pair with the value the position
+    contributes to the security. Securities are keyed like depot_merged by
+    Emittententicker, Sektor and Standort, with `depot_merged` given its final
+    Sektor is used. Direct aktie/krypto positions are attributed to themselves.
+    """
+    names = depot.set_index("wkn")["info"]
+    parts = []
+    for etf in etf_handler.etfs:
+        df = etf.zusammensetzung
+        if get_reader(etf.editor).merge_key == "Emittententicker":
+            securities = _securities_by_ticker(df)
+        else:
+            securities = _securities_by_isin(df, ex_isin_info)
+        parts.append(
+            securities.assign(
+                wkn=etf.wkn,
+                Position=names.get(etf.wkn, etf.wkn),
+                Type="ETF",
+                Wert=df["Wert"].values,
+            )
+        )
+    single = depot[depot["type"].isin(["aktie", "krypto"])]
+    parts.append(
+        pd.DataFrame(
+            {
+                "Emittententicker": single["ticker"].str.split(".").str[0].values,
+                "Sektor": single["Sektor"].map(sector_mapping_yahoo).values,
+                "Standort": single["Standort"]
+                .map(country_mapping_yahoo)
+                .replace(country_mapping_ishare)
+                .values,
+                "wkn": single["wkn"].values,
+                "Position": single["info"].values,
+                "Type": single["type"].values,
+                "Wert": single["Wert"].values,
+            }
+        )
+    )
+    index = pd.concat(parts, ignore_index=True)
+    if depot_merged is not None:
+        index["Sektor"] = _final_sektor(index, depot_merged)
+    index = index.groupby(
+        ATTRIBUTION_KEYS, as_index=False, observed=True, dropna=False
+    ).agg({"Wert": "sum"})
+    return index[index["Wert"] != 0][ATTRIBUTION_COLUMNS]
+
+
+def write_attribution_index(index: pd.DataFrame, path: str | pathlib.Path) -> None:
+    index.sort_values(["Emittententicker", "wkn"]).to_csv(
+        path, index=False, sep=",", encoding="utf-8", mode="w"
+    )
@@ -3,15 +3,8 @@ from dataclasses import dataclass
 
 import pandas as pd
 
-from depot_risk_assessment.transform_etfs import (
-    download_zusammensetzung_as_csv,
-    prepare_amundi_data,
-    prepare_invesco_data,
-    prepare_ishare_data,
-    read_amundi_from,
-    read_invesco_xlsx,
-    read_ishare_from,
-)
+from depot_risk_assessment.readers import get_reader
+from depot_risk_assessment.transform_etfs import download_zusammensetzung_as_csv
 
 
 @dataclass
@@ -28,6 +21,14 @@ class ETFConfig:
 class ETFHandler:
     etfs: list[ETFConfig]
 
+    def by_merge_key(self, merge_key: str) -> list[ETFConfig]:
+        return [
+            etf for etf in self.etfs if get_reader(etf.editor).merge_key == merge_key
+        ]
+
+    def editors_by_merge_key(self, merge_key: str) -> list[str]:
+        return sorted({etf.editor for etf in self.by_merge_key(merge_key)})
+
     @classmethod
     def from_dict(
         cls, etf_dict: dict, depot: pd.DataFrame, sector_mapping: dict[str, str]
@@ -35,20 +36,11 @@ class ETFHandler:
         etfs = []
         for key, value in etf_dict.items():
             total_value_etf = depot[depot["wkn"] == key]["Wert"].values[0]
-            if value["editor"] == "iShares":
-                url = value["url"]
-                path = value["file_path"]
-                download_zusammensetzung_as_csv(url, path)
-                df = read_ishare_from(path)
-                df = prepare_ishare_data(df, total_value_etf)
-            elif value["editor"] == "amundi":
-                path = value["file_path"]
-                df = read_amundi_from(path)
-                df = prepare_amundi_data(df, sector_mapping, total_value_etf)
-            else:
-                path = value["file_path"]
-                df = read_invesco_xlsx(path)
-                df = prepare_invesco_data(df, total_value_etf)
+            reader = get_reader(value["editor"])
+            path = value["file_path"]
+            if reader.download:
+                download_zusammensetzung_as_csv(value["url"], path)
+            df = reader.read(path, total_value_etf, sector_mapping)
             etf = ETFConfig(
                 key,
                 value["editor"],
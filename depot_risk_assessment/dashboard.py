@@ -1,9 +1,35 @@
+import pathlib
+
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from depot_risk_assessment.rebalance import DIMENSIONS, Band, Exposure, rebalance
+
+
+ATTRIBUTION_PATH = pathlib.Path("./data/depot_attribution.csv")
+
+
+@st.cache_data
+def load_attribution(path: pathlib.Path) -> pd.DataFrame:
+    attribution = pd.read_csv(
+        path,
+        dtype={
+            "Emittententicker": "category",
+            "wkn": "category",
+            "Position": "category",
+            "Type": "category",
+        },
+    )
+    return attribution.set_index("Emittententicker").sort_index()
+
+
 # Load dataset
 df = pd.read_csv("./data/depot_merged.csv")
+# Written by main.main since the attribution index exists, older outputs lack it
+attribution = (
+    load_attribution(ATTRIBUTION_PATH) if ATTRIBUTION_PATH.exists() else None
+)
 
 # Streamlit app
 st.title("Interactive Dashboard Example")
@@ -88,7 +114,39 @@ bar_chart = px.bar(
     title=f"Top {num_top_names} Names by {display_mode}",
 )
 bar_chart.update_layout(hoverlabel=dict(font_size=16))
-st.plotly_chart(bar_chart)
+bar_event = st.plotly_chart(bar_chart, on_select="rerun", selection_mode="points")
+
+# Drill-down: per position breakdown of the selected bars
+selected_names = [point["x"] for point in bar_event.selection.points]
+if attribution is None:
+    st.info(f"{ATTRIBUTION_PATH} not found, rerun main to enable the drill-down.")
+elif selected_names:
+    selected = top_names_df[top_names_df["Name"].isin(selected_names)]
+    selected_tickers = [
+        t for t in selected["Emittententicker"].unique() if t in attribution.index
+    ]
+    # Keep only the selected securities and the filtered types
+    breakdown = (
+        attribution.loc[selected_tickers]
+        .reset_index()
+        .merge(selected[["Emittententicker", "Sektor", "Standort"]])
+    )
+    breakdown = (
+        breakdown[breakdown["Type"].isin(selected_type)]
+        .groupby(["Position", "wkn"], observed=True)["Wert"]
+        .sum()
+        .reset_index()
+        .sort_values("Wert", ascending=False)
+    )
+    breakdown_chart = px.bar(
+        breakdown,
+        x="Position",
+        y="Wert",
+        hover_data={"wkn": True, "Wert": ":.2f"},
+        title=f"Exposure to {', '.join(selected_names)} by position",
+    )
+    breakdown_chart.update_layout(hoverlabel=dict(font_size=16))
+    st.plotly_chart(breakdown_chart)
 
 # Create two columns for pie charts
 col1, col2 = st.columns(2)
@@ -122,3 +180,42 @@ with col2:
     )
     standort_pie_chart.update_layout(hoverlabel=dict(font_size=16))
     st.plotly_chart(standort_pie_chart)
+
+# What-if rebalancing over the look-through exposure
+if attribution is None:
+    st.stop()
+st.header("What-if Rebalancing")
+exposure = Exposure.from_attribution(attribution.reset_index())
+col1, col2, col3 = st.columns(3)
+with col1:
+    band_dimension = st.selectbox("Select dimension:", DIMENSIONS)
+with col2:
+    band_group = st.selectbox(
+        "Select group:", exposure.weights.loc[band_dimension].index.tolist()
+    )
+with col3:
+    band_range = st.slider("Target band in %:", 0.0, 100.0, (0.0, 100.0), step=0.5)
+
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    allow_selling = st.checkbox("Allow selling", value=True)
+with col2:
+    free_cash = st.checkbox("Solve for cash", value=False)
+with col3:
+    cash = st.number_input("Additional cash:", value=0.0, step=100.0)
+with col4:
+    min_trade = st.number_input(
+        "Minimum trade size:", min_value=0.0, value=0.0, step=50.0
+    )
+
+result = rebalance(
+    exposure,
+    [Band(band_dimension, band_group, band_range[0] / 100, band_range[1] / 100)],
+    cash=None if free_cash else cash,
+    allow_selling=allow_selling,
+    min_trade=min_trade,
+)
+if not result.converged:
+    st.warning("No trades found that satisfy the target band and constraints.")
+st.dataframe(result.exposures)
+st.dataframe(result.trades[result.trades["Trade"] != 0])
@@ -1,7 +1,6 @@
 import logging
 from functools import reduce
 
-import numpy as np
 import pandas as pd
 import yahooquery as yq
 import yfinance as yf
@@ -44,7 +43,7 @@ def get_infos_from_yahoo(df: pd.DataFrame, ex_info: pd.DataFrame) -> pd.DataFram
         for i in range(len(df)):
             stock_isin = df["ISIN"][i]
             name = df["Name"][i]
-            if stock_isin is np.nan:
+            if pd.isna(stock_isin):
                 continue
             if stock_isin in ex_info["ISIN"].values:
                 continue
@@ -88,13 +87,14 @@ def get_info_for(ticker: str) -> dict[str, str | float]:
     return result
 
 
-def validate_wert_for(wert: pd.Series, editor: str, total_value: pd.Series) -> None:
-    assert (
-        abs(
-            wert.sum()
-            - sum(
-                [etf["total_value"] for etf in etfs.values() if etf["editor"] == editor]
-            )
-        )
-        < 0.2
-    )
+def get_live_price_for(ticker: str) -> float | None:
+    """Last traded price in EUR, None if Yahoo has no price for the ticker."""
+    try:
+        fast_info = yf.Ticker(ticker).fast_info
+        price = fast_info["lastPrice"]
+        if fast_info["currency"] == "USD":
+            price = price * yf.Ticker("EUR=X").fast_info["lastPrice"]
+    except (KeyError, TypeError) as e:
+        logger.error(f"No live price for {ticker}: {e}")
+        return None
+    return price
@@ -4,21 +4,21 @@ from dataclasses import dataclass
 
 import pandas as pd
 
+from depot_risk_assessment.attribution import (
+    build_attribution_index,
+    write_attribution_index,
+)
 from depot_risk_assessment.config import ETFHandler
 from depot_risk_assessment.finance_data import get_infos_for, get_infos_from_yahoo
 from depot_risk_assessment.mapping import sector_mapping
 from depot_risk_assessment.transform_etfs import (
-    merge_same_editors,
+    merge_holdings_by_isin,
+    merge_holdings_by_ticker,
     prepare_data_by_isin,
     prepare_data_by_ticker,
     prepare_single_type,
-    sum_and_replace,
-)
-from depot_risk_assessment.validation import (
-    validate_editor,
-    validate_etf,
-    validate_ishare,
 )
+from depot_risk_assessment.validation import Reconciler
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +29,11 @@ def main(
     path_to_isin_info: str,
     sink_path: str,
     ticker_config: dict,
+    reconciliation_policy: str = "fail_fast",
+    attribution_path: str | None = None,
 ):
+    if attribution_path is None:
+        attribution_path = pathlib.Path(sink_path).with_name("depot_attribution.csv")
     depot = pd.read_csv(pathlib.Path(path_to_depot), header="infer", sep=";")
     infos = get_infos_for(depot["ticker"].to_list())
     depot = pd.concat([depot, infos], axis=1)
@@ -39,99 +43,102 @@ def main(
     # depot.groupby("type").agg({"Wert": "sum", "Percentage": "sum"})
     # After checking for new data, we can adjust the ISIN column
     etf_handler = ETFHandler.from_dict(ticker_config, depot, sector_mapping)
-    depot[depot["type"] == "etf"]["Wert"].sum()
-    validate_etf(etf_handler, depot[depot["type"] == "etf"]["Wert"].sum())
+    editors = {etf.wkn: etf.editor for etf in etf_handler.etfs}
+    etf_editors = sorted(set(editors.values()))
+    reconciler = Reconciler(reconciliation_policy)
+    # ETFs without config are reconciled under their type and show up as missing
+    reconciler.set_reference(
+        depot.assign(editor=depot["wkn"].map(editors).fillna(depot["type"]))
+    )
+    reconciler.add(
+        "etf_config",
+        pd.DataFrame({"Wert": [etf.total_value for etf in etf_handler.etfs]}),
+        etf_editors + ["etf"],
+        tolerance=0.01,
+    )
     ex_isin_info = pd.read_csv(pathlib.Path(path_to_isin_info), header="infer", sep=",")
 
-    # Prepare Amundi data
-    amundi_merged = merge_same_editors(
-        [etf.zusammensetzung for etf in etf_handler.etfs if etf.editor == "amundi"],
-        ["ISIN", "Name", "Sektor", "Standort"],
-        ["ISIN", "Name", "Sektor", "Standort", "Wert"],
+    # Merge the ETFs identified by ISIN and look up the new ISINs
+    isin_editors = etf_handler.editors_by_merge_key("ISIN")
+    isin_merged = merge_holdings_by_isin(
+        [etf.zusammensetzung for etf in etf_handler.by_merge_key("ISIN")]
     )
-    amundi_merged = sum_and_replace(amundi_merged, "Wert")
-    validate_editor(etf_handler, amundi_merged["Wert"].sum(), "amundi")
-    add_amundi_info = get_infos_from_yahoo(amundi_merged, ex_isin_info)
-
-    if len(add_amundi_info) > 0:
-        logger.info("New data found")
-        ex_isin_info = pd.concat([ex_isin_info, add_amundi_info])
-
-    # After checking for new data, we can adjust the ISIN column
-    amundi_merged["ISIN"] = amundi_merged["ISIN"].fillna(amundi_merged["Name"])
-    assert len(amundi_merged) == len(amundi_merged["ISIN"].unique())
-
-    # Prepare Invesco data
-    invesco_df = [
-        etf.zusammensetzung for etf in etf_handler.etfs if etf.editor == "invesco"
-    ][0]
-    add_invesco_info = get_infos_from_yahoo(invesco_df, ex_isin_info)
-    if len(add_invesco_info) > 0:
+    add_isin_info = get_infos_from_yahoo(isin_merged, ex_isin_info)
+    if len(add_isin_info) > 0:
         logger.info("New data found")
-        ex_isin_info = pd.concat([ex_isin_info, add_invesco_info])
-    # After checking for new data, we can adjust the ISIN column
-    invesco_df["ISIN"] = invesco_df["ISIN"].fillna(invesco_df["Name"])
+        ex_isin_info = pd.concat([ex_isin_info, add_isin_info])
+    # Cache the Yahoo lookups even if the reconciliation fails later on
     ex_isin_info.to_csv(
         "./data/isin_information.csv", index=False, sep=",", encoding="utf-8", mode="w"
     )
     ex_isin_info["Emittententicker"] = ex_isin_info["Symbol"].str.split(".").str[0]
-    validate_editor(etf_handler, invesco_df["Wert"].sum(), "invesco")
-    assert len(invesco_df) == len(invesco_df["ISIN"].unique())
 
-    # Merge Amundi and Invesco
-    merged_isin = amundi_merged.merge(
-        invesco_df[["Name", "ISIN", "Wert"]], on="ISIN", how="outer"
+    # After checking for new data, we can adjust the ISIN column
+    isin_merged["ISIN"] = isin_merged["ISIN"].fillna(isin_merged["Name"])
+    reconciler.add(
+        "editor_merged",
+        isin_merged,
+        isin_editors,
+        tolerance=0.2 * len(isin_editors),
+        keys=["ISIN"],
     )
     merge_cols = ["Emittententicker", "Standort"]
-    merged_isin = prepare_data_by_isin(merged_isin, ex_isin_info, merge_cols)
-    assert (
-        abs(
-            invesco_df["Wert"].sum()
-            + amundi_merged["Wert"].sum()
-            - merged_isin["Wert"].sum()
-        )
-        < 0.1
-    )
-    ishares_merged = merge_same_editors(
-        [etf.zusammensetzung for etf in etf_handler.etfs if etf.editor == "iShares"],
-        ["Emittententicker", "Name", "Sektor", "Standort"],
-        ["Emittententicker", "Name", "Sektor", "Standort", "Wert"],
+    merged_isin = prepare_data_by_isin(isin_merged, ex_isin_info, merge_cols)
+    reconciler.add(
+        "isin_merged",
+        merged_isin,
+        isin_editors,
+        tolerance=0.1,
+        against="editor_merged",
     )
-    ishares_merged = sum_and_replace(ishares_merged, "Wert")
-    ishares_merged["Emittententicker"] = ishares_merged["Emittententicker"].fillna(
-        ishares_merged["Name"]
+
+    # Merge the ETFs identified by ticker
+    ticker_editors = etf_handler.editors_by_merge_key("Emittententicker")
+    ticker_merged = merge_holdings_by_ticker(
+        [etf.zusammensetzung for etf in etf_handler.by_merge_key("Emittententicker")]
     )
-    ishares_merged["Emittententicker"] = ishares_merged["Emittententicker"].str.replace(
-        " ", "-"
+    reconciler.add(
+        "editor_merged",
+        ticker_merged,
+        ticker_editors,
+        tolerance=0.2 * len(ticker_editors),
+        keys=["Emittententicker", "Standort"],
+        required=["Emittententicker", "Standort", "Wert"],
     )
-    validate_ishare(ishares_merged, etf_handler)
 
-    merged_df = ishares_merged.merge(merged_isin, on=merge_cols, how="outer")
+    merged_df = ticker_merged.merge(merged_isin, on=merge_cols, how="outer")
     merged_df = prepare_data_by_ticker(merged_df)
-    assert (
-        abs(
-            merged_df["Wert"].sum() - sum([etf.total_value for etf in etf_handler.etfs])
-        )
-        < 1
-    )
+    reconciler.add("etf_merged", merged_df, etf_editors, tolerance=1)
 
     # Prepare Aktien
     aktien_depot = prepare_single_type(depot, "aktie")
     krypto_depot = prepare_single_type(depot, "krypto")
 
     depot_merged = pd.concat([merged_df, aktien_depot, krypto_depot], axis=0)
-
-    assert (
-        abs(
-            depot_merged["Wert"].sum()
-            - depot[depot["type"].isin(["etf", "aktie", "krypto"])]["Wert"].sum()
-        )
-        < 1
+    reconciler.add(
+        "depot_merged",
+        depot_merged,
+        etf_editors + ["etf", "aktie", "krypto"],
+        tolerance=1,
     )
     depot_merged["Name"] = depot_merged.groupby(
         ["Emittententicker", "Sektor", "Standort"]
     )["Name"].transform("first")
+    attribution = build_attribution_index(
+        etf_handler, ex_isin_info, depot, depot_merged
+    )
+    reconciler.add(
+        "attribution",
+        attribution,
+        etf_editors + ["etf", "aktie", "krypto"],
+        tolerance=1,
+        against="depot_merged",
+    )
+    # Raises with all issues at once for the "fail" policy, before any results
+    reconciler.run()
+
     depot_merged.to_csv(sink_path, index=False, sep=",", encoding="utf-8", mode="w")
+    write_attribution_index(attribution, attribution_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+import logging
+import pathlib
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+import pandas as pd
+
+from depot_risk_assessment.transform_etfs import NORMALIZED_COLUMNS, rescale
+
+logger = logging.getLogger(__name__)
+
+MERGE_KEYS = ("ISIN", "Emittententicker")
+
+
+def to_float(
+    col: pd.Series, decimal: str = ",", thousands: str | None = None
+) -> pd.Series:
+    """Convert locale formatted numbers such as "1.234,56%" to float.
+
+    All characters that are not part of a float are removed or replaced in a
+    single translate pass. Empty values become NaN, values that cannot be
+    parsed raise a ValueError.
+    """
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float)
+    table = {"%": None, " ": None, "\xa0": None}
+    if thousands is not None:
+        table[thousands] = None
+    table[decimal] = "."
+    cleaned = col.str.translate(str.maketrans(table))
+    result = pd.to_numeric(cleaned, errors="coerce")
+    failed = result.isna() & cleaned.notna() & (cleaned != "")
+    if failed.any():
+        raise ValueError(
+            f"{failed.sum()} values of {col.name} could not be converted to float, "
+            f"e.g. {col[failed].unique()[:5].tolist()}"
+        )
+    return result
+
+
+@dataclass(frozen=True)
+class IssuerReader:
+    """Describes how the holdings file of an issuer is read and normalized.
+
+    `columns` maps the source column names to the normalized schema, only
+    these columns are read from the file with the declared `dtype`. Weights
+    keep their text form and are converted by `to_float`. `merge_key` is the
+    column main uses to merge the holdings with those of other ETFs.
+    """
+
+    editor: str
+    columns: dict[str, str]
+    merge_key: str
+    sep: str = ","
+    skiprows: int = 0
+    header: int | str = "infer"
+    dtype: dict[str, str] = field(default_factory=dict)
+    decimal: str = ","
+    thousands: str | None = None
+    encoding: str | None = None
+    excel: bool = False
+    download: bool = False
+    map_sectors: bool = False
+    chunksize: int = 5000
+    prepare: Callable[[pd.DataFrame], pd.DataFrame] | None = None
+
+    def __post_init__(self):
+        if self.merge_key not in MERGE_KEYS:
+            raise ValueError(
+                f"Merge key must be one of {MERGE_KEYS}, got {self.merge_key}"
+            )
+
+    def iter_chunks(self, file_path: pathlib.Path) -> Iterator[pd.DataFrame]:
+        if self.excel:
+            # Excel files cannot be streamed by pandas, read them in one go
+            yield pd.read_excel(
+                file_path,
+                header=self.header,
+                skiprows=self.skiprows,
+                usecols=list(self.columns),
+                dtype=self.dtype,
+            )
+            return
+        yield from pd.read_csv(
+            file_path,
+            header=self.header,
+            sep=self.sep,
+            skiprows=self.skiprows,
+            usecols=list(self.columns),
+            dtype=self.dtype,
+            encoding=self.encoding,
+            chunksize=self.chunksize,
+        )
+
+    def normalize_chunk(
+        self, chunk: pd.DataFrame, sector_mapping: dict[str, str] | None = None
+    ) -> pd.DataFrame:
+        chunk = chunk.rename(columns=self.columns)
+        if self.prepare is not None:
+            chunk = self.prepare(chunk)
+        chunk["Gewichtung"] = to_float(
+            chunk["Gewichtung"], self.decimal, self.thousands
+        )
+        if self.map_sectors and sector_mapping is not None:
+            chunk["Sektor"] = chunk["Sektor"].map(sector_mapping)
+        chunk = chunk[
+            chunk["Gewichtung"].notna()
+            & (chunk["Gewichtung"] != 0)
+            & chunk["Name"].notna()
+        ]
+        return chunk.reindex(columns=NORMALIZED_COLUMNS[:-1])
+
+    def read(
+        self,
+        file_path: pathlib.Path,
+        value: float,
+        sector_mapping: dict[str, str] | None = None,
+    ) -> pd.DataFrame:
+        chunks = [
+            self.normalize_chunk(chunk, sector_mapping)
+            for chunk in self.iter_chunks(file_path)
+        ]
+        df = pd.concat(chunks, ignore_index=True)
+        logger.debug(f"Read {len(df)} holdings for {self.editor} from {file_path}")
+        df["Gewichtung"] = rescale(df["Gewichtung"])
+        df["Wert"] = round(df["Gewichtung"] * value / 100, 2)
+        return df
+
+
+READERS: dict[str, IssuerReader] = {}
+
+
+def register_reader(reader: IssuerReader) -> IssuerReader:
+    READERS[reader.editor] = reader
+    return reader
+
+
+def get_reader(editor: str) -> IssuerReader:
+    try:
+        return READERS[editor]
+    except KeyError:
+        raise ValueError(
+            f"No reader registered for editor {editor}, "
+            f"available are {list(READERS)}"
+        ) from None
+
+
+def _prepare_ishare(df: pd.DataFrame) -> pd.DataFrame:
+    df["Sektor"] = df["Sektor"].str.strip()
+    return df
+
+
+def _prepare_amundi(df: pd.DataFrame) -> pd.DataFrame:
+    df["Name"] = df["Name"].fillna(df["Anlageklasse"])
+    return df
+
+
+def _prepare_invesco(df: pd.DataFrame) -> pd.DataFrame:
+    df["Name"] = df["Name"].str.split("USD").str[0].str.strip()
+    # After checking for new data, we can adjust the ISIN column
+    df["ISIN"] = df["ISIN"].fillna(df["Name"])
+    return df
+
+
+register_reader(
+    IssuerReader(
+        editor="iShares",
+        columns={
+            "Emittententicker": "Emittententicker",
+            "Name": "Name",
+            "Sektor": "Sektor",
+            "Standort": "Standort",
+            "Gewichtung (%)": "Gewichtung",
+        },
+        merge_key="Emittententicker",
+        sep=",",
+        skiprows=2,
+        dtype={
+            "Emittententicker": "str",
+            "Name": "str",
+            "Sektor": "str",
+            "Standort": "str",
+            "Gewichtung (%)": "str",
+        },
+        download=True,
+        prepare=_prepare_ishare,
+    )
+)
+register_reader(
+    IssuerReader(
+        editor="amundi",
+        columns={
+            "ISIN": "ISIN",
+            "Name": "Name",
+            "Anlageklasse": "Anlageklasse",
+            "Sektor": "Sektor",
+            "Land": "Standort",
+            "Gewichtung": "Gewichtung",
+        },
+        merge_key="ISIN",
+        sep=";",
+        skiprows=19,
+        dtype={
+            "ISIN": "str",
+            "Name": "str",
+            "Anlageklasse": "str",
+            "Sektor": "str",
+            "Land": "str",
+            "Gewichtung": "str",
+        },
+        map_sectors=True,
+        prepare=_prepare_amundi,
+    )
+)
+register_reader(
+    IssuerReader(
+        editor="invesco",
+        columns={"Full name": "Name", "ISIN": "ISIN", "Weight": "Gewichtung"},
+        merge_key="ISIN",
+        header=1,
+        skiprows=4,
+        dtype={"Full name": "str", "ISIN": "str", "Weight": "float"},
+        decimal=".",
+        excel=True,
+        prepare=_prepare_invesco,
+    )
+)
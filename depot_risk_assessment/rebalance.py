@@ -0,0 +1,260 @@
+import logging
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("Sektor", "Standort", "Type")
+SOLVER_MARGIN = 1e-4
+
+
+@dataclass
+class Band:
+    dimension: str
+    group: str
+    lower: float = 0.0
+    upper: float = 1.0
+
+
+@dataclass
+class Exposure:
+    """Look-through exposure of the tradable positions.
+
+    `values` holds the current Wert per position (wkn), `weights` the share
+    of every position that falls into a (dimension, group). ETF compositions
+    are assumed to stay constant when trading.
+    """
+
+    names: pd.Series
+    values: pd.Series
+    weights: pd.DataFrame
+
+    @classmethod
+    def from_attribution(cls, attribution: pd.DataFrame) -> "Exposure":
+        values = attribution.groupby("wkn", observed=True)["Wert"].sum()
+        names = attribution.drop_duplicates(subset="wkn").set_index("wkn")["Position"]
+        weights = []
+        for dimension in DIMENSIONS:
+            pivot = attribution.pivot_table(
+                index=dimension,
+                columns="wkn",
+                values="Wert",
+                aggfunc="sum",
+                fill_value=0,
+                observed=True,
+            )
+            pivot.index = pd.MultiIndex.from_product(
+                [[dimension], pivot.index.astype(str)], names=["dimension", "group"]
+            )
+            weights.append(pivot)
+        weights = pd.concat(weights).reindex(columns=values.index).fillna(0)
+        return cls(names.reindex(values.index), values, weights / values)
+
+    def shares(self, values: pd.Series) -> pd.Series:
+        return self.weights @ values / values.sum()
+
+
+@dataclass
+class RebalanceResult:
+    trades: pd.DataFrame
+    exposures: pd.DataFrame
+    converged: bool
+
+
+def solve_qp(
+    P: np.ndarray,
+    q: np.ndarray,
+    A: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    rho: float = 0.1,
+    sigma: float = 1e-6,
+    alpha: float = 1.6,
+    eps: float = 1e-6,
+    max_iter: int = 4000,
+    adapt_every: int = 25,
+) -> tuple[np.ndarray, bool]:
+    """Solve min 1/2 x'Px + q'x s.t. lower <= Ax <= upper with ADMM.
+
+    Follows the OSQP iteration: the linear system is only refactorized when
+    rho is adapted, every other iteration is a few matrix-vector products.
+    """
+    n, m = P.shape[0], A.shape[0]
+    equality = lower == upper
+
+    def factorize(rho: float) -> tuple[np.ndarray, np.ndarray]:
+        rho_vec = np.where(equality, 1e3 * rho, rho)
+        K = P + sigma * np.eye(n) + A.T @ (rho_vec[:, None] * A)
+        return rho_vec, np.linalg.inv(K)
+
+    rho_vec, K_inv = factorize(rho)
+    x, z, y = np.zeros(n), np.zeros(m), np.zeros(m)
+    for i in range(1, max_iter + 1):
+        x_tilde = K_inv @ (sigma * x - q + A.T @ (rho_vec * z - y))
+        z_tilde = A @ x_tilde
+        x = alpha * x_tilde + (1 - alpha) * x
+        z_relaxed = alpha * z_tilde + (1 - alpha) * z
+        z_new = np.clip(z_relaxed + y / rho_vec, lower, upper)
+        y = y + rho_vec * (z_relaxed - z_new)
+        z = z_new
+
+        Ax, Px, Aty = A @ x, P @ x, A.T @ y
+        primal = np.abs(Ax - z).max(initial=0)
+        dual = np.abs(Px + q + Aty).max(initial=0)
+        primal_scale = max(np.abs(Ax).max(initial=0), np.abs(z).max(initial=0))
+        dual_scale = max(
+            np.abs(Px).max(initial=0),
+            np.abs(Aty).max(initial=0),
+            np.abs(q).max(initial=0),
+        )
+        if primal < eps * (1 + primal_scale) and dual < eps * (1 + dual_scale):
+            return x, True
+        if i % adapt_every == 0:
+            primal_rel = primal / (primal_scale + 1e-12)
+            dual_rel = dual / (dual_scale + 1e-12)
+            ratio = np.sqrt(primal_rel / (dual_rel + 1e-12))
+            if ratio > 5 or ratio < 0.2:
+                rho = float(np.clip(rho * ratio, 1e-6, 1e6))
+                rho_vec, K_inv = factorize(rho)
+    logger.debug(f"QP did not converge, residuals {primal:.2e} and {dual:.2e}")
+    return x, False
+
+
+def _clean_trades(
+    trades: np.ndarray, x0: np.ndarray, allow_selling: bool, tolerance: float
+) -> np.ndarray:
+    """Clip the (euro) trades of the solver to their bounds and drop noise."""
+    trades = np.maximum(trades, -x0)
+    if not allow_selling:
+        trades = np.maximum(trades, 0)
+    trades[np.abs(trades) < tolerance] = 0
+    return trades
+
+
+def _is_feasible(
+    trades: np.ndarray,
+    x0: np.ndarray,
+    W: np.ndarray,
+    bands: list[Band],
+    cash: float | None,
+    min_trade: float,
+    tolerance: float,
+) -> bool:
+    new_values = x0 + trades
+    shares = W @ new_values / new_values.sum()
+    traded = trades[trades != 0]
+    return bool(
+        all(band.lower <= share <= band.upper for band, share in zip(bands, shares))
+        and (np.abs(traded) >= min_trade - tolerance).all()
+        and (cash is None or abs(trades.sum() - cash) <= len(x0) * tolerance)
+    )
+
+
+def rebalance(
+    exposure: Exposure,
+    bands: list[Band],
+    cash: float | None = 0.0,
+    allow_selling: bool = True,
+    min_trade: float = 0.0,
+    tolerance: float = 1.0,
+) -> RebalanceResult:
+    """Find the smallest trades (least squares) that bring all bands in range.
+
+    `cash` is the net amount invested (None leaves it free), with
+    `allow_selling=False` positions can only be bought. Trades smaller than
+    `min_trade` are either dropped or raised to `min_trade`. Trades below
+    `tolerance` euros are solver noise and set to zero; the cleaned trades
+    are checked again and `converged` is False if they break a constraint.
+    """
+    x0 = exposure.values.to_numpy(dtype=float)
+    total = x0.sum()
+    # Work in shares of the current total to keep the problem well scaled
+    x0_scaled = x0 / total
+    n = len(x0)
+    keys = [(band.dimension, band.group) for band in bands]
+    W = exposure.weights.reindex(keys, fill_value=0).to_numpy(dtype=float)
+    lower_shares = np.array([band.lower for band in bands])
+    upper_shares = np.array([band.upper for band in bands])
+    # Solve for slightly tighter bands, so the solver accuracy does not push
+    # the result out of the requested bands. Euro rounding is left to the
+    # cleanup and the feasibility check, the margin is independent of the depot
+    margin = np.minimum(SOLVER_MARGIN, (upper_shares - lower_shares) / 2)
+    solve_lower = np.where(lower_shares > 0, lower_shares + margin, lower_shares)
+    solve_upper = np.where(upper_shares < 1, upper_shares - margin, upper_shares)
+    ones = np.ones(n)
+
+    # lower * sum(x) <= w.x <= upper * sum(x) with x = x0 + t
+    A_lower = W - solve_lower[:, None] * ones
+    A_upper = W - solve_upper[:, None] * ones
+    A = np.vstack([A_lower, A_upper, np.eye(n), ones])
+    lower = np.concatenate(
+        [-A_lower @ x0_scaled, np.full(len(bands), -np.inf), -x0_scaled, [-np.inf]]
+    )
+    upper = np.concatenate(
+        [
+            np.full(len(bands), np.inf),
+            -A_upper @ x0_scaled,
+            np.full(n, np.inf),
+            [np.inf],
+        ]
+    )
+    if not allow_selling:
+        lower[2 * len(bands) : -1] = 0
+    if cash is not None:
+        lower[-1] = upper[-1] = cash / total
+
+    P, q = np.eye(n), np.zeros(n)
+    trades, converged = solve_qp(P, q, A, lower, upper)
+    # Trades below min_trade are decided one at a time, smallest first: they
+    # are dropped if the bands stay feasible and raised to min_trade otherwise
+    min_scaled = min_trade / total
+    noise = tolerance / total
+    decided = np.zeros(n, dtype=bool)
+    while min_trade > 0 and converged:
+        small = ~decided & (np.abs(trades) >= noise) & (np.abs(trades) < min_scaled)
+        if not small.any():
+            break
+        i = np.flatnonzero(small)[np.abs(trades[small]).argmin()]
+        decided[i] = True
+        row = 2 * len(bands) + i
+        direction = np.sign(trades[i])
+        dropped_lower, dropped_upper = lower.copy(), upper.copy()
+        dropped_lower[row] = dropped_upper[row] = 0
+        dropped, converged = solve_qp(P, q, A, dropped_lower, dropped_upper)
+        if converged:
+            lower, upper, trades = dropped_lower, dropped_upper, dropped
+            continue
+        if direction > 0:
+            lower[row] = max(lower[row], min_scaled)
+        else:
+            upper[row] = min(upper[row], -min_scaled)
+        trades, converged = solve_qp(P, q, A, lower, upper)
+
+    trades = _clean_trades(trades * total, x0, allow_selling, tolerance)
+    converged = converged and _is_feasible(
+        trades, x0, W, bands, cash, min_trade, tolerance
+    )
+    if not converged:
+        logger.warning("No trades found that satisfy all bands and constraints")
+    trades = pd.Series(trades, index=exposure.values.index)
+    new_values = exposure.values + trades
+    trade_df = pd.DataFrame(
+        {
+            "Position": exposure.names,
+            "Wert": exposure.values,
+            "Trade": trades.round(2),
+            "Wert_neu": new_values.round(2),
+        }
+    )
+    exposures = pd.DataFrame(
+        {
+            "lower": lower_shares,
+            "upper": upper_shares,
+            "Vorher": exposure.shares(exposure.values).reindex(keys).to_numpy(),
+            "Nachher": exposure.shares(new_values).reindex(keys).to_numpy(),
+        },
+        index=pd.MultiIndex.from_tuples(keys, names=["dimension", "group"]),
+    )
+    return RebalanceResult(trade_df.reset_index(), exposures.reset_index(), converged)
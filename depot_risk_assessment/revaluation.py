@@ -0,0 +1,204 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable
+
+import numpy as np
+import pandas as pd
+
+from depot_risk_assessment.finance_data import get_live_price_for
+from depot_risk_assessment.rebalance import Exposure
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_DIMENSIONS = ["Sektor", "Standort"]
+
+
+@dataclass
+class ReplayPriceFeed:
+    """Replays recorded price ticks (ticker -> price), e.g. for testing."""
+
+    ticks: list[dict[str, float]]
+    delay: float = 0.0
+
+    async def stream(self) -> AsyncIterator[dict[str, float]]:
+        for tick in self.ticks:
+            await asyncio.sleep(self.delay)
+            yield tick
+
+
+@dataclass
+class YahooPriceFeed:
+    """Polls Yahoo for the tickers and yields the prices that changed.
+
+    Missing prices and prices that are not positive are dropped.
+    """
+
+    tickers: list[str]
+    interval: float = 60.0
+
+    async def stream(self) -> AsyncIterator[dict[str, float]]:
+        last_prices: dict[str, float] = {}
+        while True:
+            prices = await asyncio.gather(
+                *(
+                    asyncio.to_thread(get_live_price_for, ticker)
+                    for ticker in self.tickers
+                ),
+                return_exceptions=True,
+            )
+            changed = {}
+            for ticker, price in zip(self.tickers, prices):
+                if isinstance(price, Exception):
+                    logger.error(f"Price for {ticker} not received: {price}")
+                    continue
+                # Also catches NaN
+                if price is None or not price > 0:
+                    logger.warning(f"Invalid price {price} for {ticker} dropped")
+                    continue
+                if last_prices.get(ticker) != price:
+                    changed[ticker] = last_prices[ticker] = price
+            if changed:
+                yield changed
+            await asyncio.sleep(self.interval)
+
+
+@dataclass
+class Revaluator:
+    """Keeps Wert and Percentage by Sektor and Standort up to date with prices.
+
+    The look-through weights are fixed, so a price tick only changes the
+    value of the positions holding the ticker. Every batch updates the
+    aggregates with the weight columns of the changed positions only.
+    """
+
+    tickers: np.ndarray
+    quantities: np.ndarray
+    prices: np.ndarray
+    groups: pd.MultiIndex
+    weights: np.ndarray
+    resync_every: int = 1000
+    values: np.ndarray = field(init=False)
+    aggregates: np.ndarray = field(init=False)
+    total: float = field(init=False)
+    _positions: dict[str, np.ndarray] = field(init=False)
+    _batches: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self._positions = pd.Series(self.tickers).groupby(self.tickers).indices
+        self.resync()
+
+    @classmethod
+    def from_exposure(
+        cls, exposure: Exposure, depot: pd.DataFrame, eval_date: str
+    ) -> "Revaluator":
+        positions = depot.drop_duplicates(subset="wkn").set_index("wkn")
+        positions = positions.reindex(exposure.values.index)
+        quantities = positions[eval_date].astype(float)
+        # Positions sold since the last full run cannot be priced
+        missing = quantities.isna() | (quantities == 0)
+        if missing.any():
+            logger.warning(
+                f"Positions {missing[missing].index.tolist()} are not in the "
+                f"depot on {eval_date} and are dropped"
+            )
+        values = exposure.values[~missing]
+        positions = positions.loc[values.index]
+        quantities = quantities[values.index].to_numpy()
+        weights = exposure.weights.loc[PUBLISHED_DIMENSIONS, values.index]
+        return cls(
+            tickers=positions["ticker"].to_numpy(),
+            quantities=quantities,
+            # Start from the prices of the last full run
+            prices=values.to_numpy(dtype=float) / quantities,
+            groups=weights.index,
+            weights=weights.to_numpy(dtype=float),
+        )
+
+    def resync(self) -> None:
+        """Recompute all aggregates to remove accumulated rounding errors."""
+        self.values = self.quantities * self.prices
+        self.aggregates = self.weights @ self.values
+        self.total = self.values.sum()
+
+    def apply(self, prices: dict[str, float]) -> bool:
+        """Apply a batch of prices, returns False if no ticker is held."""
+        known = [ticker for ticker in prices if ticker in self._positions]
+        if not known:
+            return False
+        positions = [self._positions[ticker] for ticker in known]
+        idx = np.concatenate(positions)
+        new_prices = np.repeat(
+            [prices[ticker] for ticker in known], [len(p) for p in positions]
+        )
+        delta = self.quantities[idx] * new_prices - self.values[idx]
+        self.prices[idx] = new_prices
+        self.values[idx] += delta
+        self.aggregates += self.weights[:, idx] @ delta
+        self.total += delta.sum()
+        self._batches += 1
+        if self._batches % self.resync_every == 0:
+            self.resync()
+        return True
+
+    def snapshot(self) -> pd.DataFrame:
+        snapshot = pd.DataFrame({"Wert": self.aggregates}, index=self.groups)
+        snapshot["Percentage"] = snapshot["Wert"] / self.total * 100
+        return snapshot.reset_index()
+
+    async def run(
+        self,
+        feed: ReplayPriceFeed | YahooPriceFeed,
+        publish: Callable[[pd.DataFrame], None],
+        batch_window: float = 0.0,
+    ) -> None:
+        """Apply the ticks of the feed in micro-batches and publish snapshots.
+
+        All ticks that arrived while the previous batch was applied (or within
+        `batch_window` seconds) are merged into one batch, last price wins.
+        Batches without any held ticker are not published. Errors of the feed
+        are raised once the ticks before them have been applied.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def produce() -> None:
+            try:
+                async for tick in feed.stream():
+                    await queue.put(tick)
+            finally:
+                queue.put_nowait(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            finished = False
+            while not finished:
+                batch = await queue.get()
+                if batch is done:
+                    break
+                batch = dict(batch)
+                if batch_window > 0:
+                    await asyncio.sleep(batch_window)
+                while not queue.empty():
+                    tick = queue.get_nowait()
+                    if tick is done:
+                        finished = True
+                        break
+                    batch.update(tick)
+                if self.apply(batch):
+                    publish(self.snapshot())
+            # Reraises the exception of the feed, if any
+            await producer
+        finally:
+            producer.cancel()
+
+
+if __name__ == "__main__":
+    eval_date = "06.11.2024"
+    depot = pd.read_csv("./data/depot.csv", header="infer", sep=";")
+    exposure = Exposure.from_attribution(pd.read_csv("./data/depot_attribution.csv"))
+    revaluator = Revaluator.from_exposure(exposure, depot, eval_date)
+    feed = YahooPriceFeed(list(pd.unique(revaluator.tickers)))
+    asyncio.run(
+        revaluator.run(feed, lambda snapshot: logger.info(f"\n{snapshot}"))
+    )
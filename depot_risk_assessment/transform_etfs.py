@@ -2,7 +2,6 @@ import logging
 import pathlib
 import re
 import unicodedata
-from functools import reduce
 
 import pandas as pd
 import requests
@@ -16,19 +15,15 @@ from depot_risk_assessment.mapping import (
 
 logger = logging.getLogger(__name__)
 
-
-def read_ishare_from(file_path: pathlib.Path) -> pd.DataFrame:
-    return pd.read_csv(file_path, header="infer", sep=",", skiprows=2)
-
-
-def read_invesco_xlsx(file_path: pathlib.Path) -> pd.DataFrame:
-    return pd.read_excel(file_path, header=1, skiprows=4)
-
-
-def read_amundi_from(file_path: pathlib.Path) -> pd.DataFrame:
-    df = pd.read_csv(file_path, header="infer", skiprows=19, sep=";")
-    df = df[~df["Gewichtung"].isna()]
-    return df
+NORMALIZED_COLUMNS = [
+    "ISIN",
+    "Emittententicker",
+    "Name",
+    "Sektor",
+    "Standort",
+    "Gewichtung",
+    "Wert",
+]
 
 
 def download_zusammensetzung_as_csv(url: str, file_path: pathlib.Path) -> None:
@@ -69,60 +64,47 @@ def sum_duplicates_by(
     return result
 
 
-def prepare_amundi_data(
-    df: pd.DataFrame,
-    sector_mapping: dict[str, str],
-    value: float,
-) -> pd.DataFrame:
-    # Cleaning
-    df = df.drop(columns="Unnamed: 0")
-    df["Name"] = df["Name"].fillna(df["Anlageklasse"])
-    df["Gewichtung"] = (
-        df["Gewichtung"].str.replace("%", "").str.replace(",", ".").astype(float)
-    )
-    df = df[df["Gewichtung"] != 0]
-    df = df.rename(columns={"Land": "Standort"})
-    df["Sektor"] = df["Sektor"].map(sector_mapping)
-    df["Gewichtung"] = rescale(df["Gewichtung"])
-    df["Wert"] = round(df["Gewichtung"] * value / 100, 2)
-    return df
-
-
 def rescale(col: pd.Series) -> pd.Series:
     return round(100 * col / sum(col), 8)
 
 
-def prepare_invesco_data(df: pd.DataFrame, value: float) -> pd.DataFrame:
-    df = df[~df["Weight"].isna()]
-    df = df.rename(columns={"Full name": "Name", "Weight": "Gewichtung"})
-    df["Name"] = df["Name"].str.split("USD").str[0].str.strip()
-    # After checking for new data, we can adjust the ISIN column
-    df["ISIN"] = df["ISIN"].fillna(df["Name"])
-    df["Gewichtung"] = rescale(df["Gewichtung"])
-    df["Wert"] = round(df["Gewichtung"] * value / 100, 2)
-    return df
-
-
-def prepare_ishare_data(df: pd.DataFrame, value: float) -> pd.DataFrame:
-    df = df.rename(columns={"Gewichtung (%)": "Gewichtung", "Marktwährung": "Währung"})
-    df = df[df["Name"].notnull()]
-    df["Sektor"] = df["Sektor"].str.strip()
-    df["Gewichtung"] = (
-        df["Gewichtung"].str.replace("%", "").str.replace(",", ".").astype(float)
+def concat_holdings(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    if not dfs:
+        return pd.DataFrame(columns=NORMALIZED_COLUMNS)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def merge_holdings_by_isin(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Sum normalized holdings by ISIN, holdings without ISIN by Name."""
+    df = concat_holdings(dfs)
+    key = df["ISIN"].fillna(df["Name"])
+    return (
+        df.groupby(key, sort=False)
+        .agg(
+            {
+                "ISIN": "first",
+                "Name": "first",
+                "Sektor": "first",
+                "Standort": "first",
+                "Wert": "sum",
+            }
+        )
+        .reset_index(drop=True)
     )
-    df = df[df["Gewichtung"] != 0]
-    df["Gewichtung"] = rescale(df["Gewichtung"])
-    df["Wert"] = round(df["Gewichtung"] * value / 100, 2)
-    return df
 
 
-def merge_same_editors(
-    dfs: list[pd.DataFrame], merge_cols: list[str], col_to_keep: list[str]
-) -> pd.DataFrame:
-    dfs = [df[col_to_keep] for df in dfs]
-    # merge all dataframes in list on merge_cols using functools
-    df = reduce(lambda x, y: x.merge(y, on=merge_cols, how="outer"), dfs)
-    return df
+def merge_holdings_by_ticker(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Sum normalized holdings by ticker, holdings without ticker by Name."""
+    df = concat_holdings(dfs)
+    df["Emittententicker"] = (
+        df["Emittententicker"].fillna(df["Name"]).str.replace(" ", "-")
+    )
+    return df.groupby(
+        ["Emittententicker", "Name", "Sektor", "Standort"],
+        dropna=False,
+        sort=False,
+        as_index=False,
+    ).agg({"Wert": "sum"})
 
 
 def sum_and_replace(df: pd.DataFrame, col_contains: str) -> pd.DataFrame:
@@ -145,9 +127,7 @@ def merge_and_drop_col(
 def prepare_data_by_isin(
     df: pd.DataFrame, ex_isin_info: pd.DataFrame, merge_cols: list[str]
 ) -> pd.DataFrame:
-    merged_isin = sum_and_replace(df, "Wert")
-    merged_isin = merge_and_drop_col(merged_isin, "Name_x", "Name_y", "Name")
-    merged_isin = merged_isin.merge(ex_isin_info, on="ISIN", how="left")
+    merged_isin = df.merge(ex_isin_info, on="ISIN", how="left")
     merged_isin["Standort_y"] = merged_isin["Standort_y"].map(country_mapping_yahoo)
     merged_isin = merge_and_drop_col(
         merged_isin, "Standort_x", "Standort_y", "Standort"
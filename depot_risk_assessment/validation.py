@@ -1,27 +1,144 @@
+import logging
+from dataclasses import dataclass, field
+
 import pandas as pd
 
-from depot_risk_assessment.config import ETFHandler
+logger = logging.getLogger(__name__)
+
+POLICIES = ("fail_fast", "fail", "warn")
+
+
+class ReconciliationError(Exception):
+    def __init__(self, report: "ReconciliationReport"):
+        super().__init__(str(report))
+        self.report = report
+
+
+@dataclass
+class ReconciliationReport:
+    summary: pd.DataFrame
+    issues: pd.DataFrame
+
+    @property
+    def ok(self) -> bool:
+        return self.issues.empty
+
+    def __str__(self) -> str:
+        if self.ok:
+            return "Reconciliation passed"
+        return f"Reconciliation found {len(self.issues)} issues:\n" + (
+            self.issues.to_string(index=False)
+        )
+
 
+@dataclass
+class _StageSpec:
+    stage: str
+    scope: str
+    editors: frozenset[str]
+    tolerance: float
+    against: str | None
 
-def validate_etf(etf_handler: ETFHandler, depot_wert: float) -> None:
-    assert abs(sum([etf.total_value for etf in etf_handler.etfs]) - depot_wert) < 0.01
 
+@dataclass
+class Reconciler:
+    """Collects the values of every pipeline stage in one long format frame.
 
-def validate_editor(etf_handler: ETFHandler, wert: float, editor: str) -> None:
-    assert (
-        abs(
-            wert
-            - sum([etf.total_value for etf in etf_handler.etfs if etf.editor == editor])
+    All tolerances, duplicate keys and missing values are checked in a single
+    grouped pass by `run`. With "fail_fast" every stage is also checked when
+    it is added and the first failing stage raises a ReconciliationError.
+    With "fail" `run` raises one error carrying all issues, with "warn" the
+    issues are only logged.
+    """
+
+    policy: str = "fail_fast"
+    reference: pd.Series | None = None
+    _records: list[pd.DataFrame] = field(default_factory=list)
+    _specs: list[_StageSpec] = field(default_factory=list)
+
+    def __post_init__(self):
+        if self.policy not in POLICIES:
+            raise ValueError(f"Policy must be one of {POLICIES}, got {self.policy}")
+
+    def set_reference(self, values: pd.DataFrame) -> None:
+        """Expected values per editor, needs the columns editor and Wert."""
+        self.reference = values.groupby("editor")["Wert"].sum()
+
+    def add(
+        self,
+        stage: str,
+        df: pd.DataFrame,
+        editors: list[str],
+        tolerance: float,
+        keys: list[str] | None = None,
+        required: list[str] | None = None,
+        against: str | None = None,
+    ) -> None:
+        """Record the values of a stage covering the given editors.
+
+        The total Wert is compared to the reference of the editors or, if
+        `against` is given, to the total of that stage for the same editors.
+        """
+        scope = "+".join(sorted(editors))
+        record = pd.DataFrame(
+            {"stage": stage, "scope": scope, "Wert": df["Wert"].values}
         )
-        < 0.2
-    )
-
-
-def validate_ishare(df: pd.DataFrame, etf_handler: ETFHandler) -> None:
-    validate_editor(etf_handler, df["Wert"].sum(), "iShares")
-    assert df["Emittententicker"].isna().sum() == 0
-    assert df["Standort"].isna().sum() == 0
-    assert df["Wert"].isna().sum() == 0
-    assert (
-        df.groupby(["Emittententicker", "Standort"]).agg({"Standort": "count"}) > 1
-    )["Standort"].sum() == 0
+        if keys is not None:
+            record["duplicated"] = df.duplicated(subset=keys).values
+        for col in required or []:
+            record[f"missing_{col}"] = df[col].isna().values
+        self._records.append(record)
+        spec = _StageSpec(stage, scope, frozenset(editors), tolerance, against)
+        self._specs.append(spec)
+        if self.policy == "fail_fast":
+            report = self._evaluate([spec])
+            if not report.ok:
+                raise ReconciliationError(report)
+
+    def _expected(self, spec: _StageSpec, totals: pd.Series) -> float:
+        if spec.against is None:
+            if self.reference is None:
+                raise ValueError(f"No reference set to reconcile stage {spec.stage}")
+            return self.reference[self.reference.index.isin(spec.editors)].sum()
+        scopes = [
+            other.scope
+            for other in self._specs
+            if other.stage == spec.against and other.editors <= spec.editors
+        ]
+        return totals[spec.against][scopes].sum()
+
+    def _evaluate(self, specs: list[_StageSpec]) -> ReconciliationReport:
+        records = pd.concat(self._records, ignore_index=True)
+        flag_cols = [
+            col for col in records.columns if col not in ("stage", "scope", "Wert")
+        ]
+        records[flag_cols] = records[flag_cols].fillna(False).astype(int)
+        grouped = records.groupby(["stage", "scope"], sort=False)
+        summary = grouped[["Wert", *flag_cols]].sum()
+        summary.insert(0, "rows", grouped.size())
+
+        issues = []
+        for spec in specs:
+            row = summary.loc[(spec.stage, spec.scope)]
+            expected = self._expected(spec, summary["Wert"])
+            if abs(row["Wert"] - expected) >= spec.tolerance:
+                check = "value_conservation"
+                issues.append((spec.stage, spec.scope, check, row["Wert"], expected))
+            for col in flag_cols:
+                if row[col] > 0:
+                    issues.append((spec.stage, spec.scope, col, row[col], 0))
+        issues = pd.DataFrame(
+            issues, columns=["stage", "scope", "check", "value", "expected"]
+        ).drop_duplicates()
+
+        return ReconciliationReport(summary.reset_index(), issues)
+
+    def run(self) -> ReconciliationReport:
+        report = self._evaluate(self._specs)
+        if report.ok:
+            logger.info(str(report))
+        elif self.policy != "warn":
+            raise ReconciliationError(report)
+        else:
+            logger.warning(str(report))
+        return report
@@ -0,0 +1,165 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+
+from depot_risk_assessment.attribution import (
+    ATTRIBUTION_COLUMNS,
+    build_attribution_index,
+    write_attribution_index,
+)
+from depot_risk_assessment.config import ETFConfig, ETFHandler
+from depot_risk_assessment.readers import NORMALIZED_COLUMNS
+from depot_risk_assessment.transform_etfs import (
+    merge_holdings_by_isin,
+    merge_holdings_by_ticker,
+    prepare_data_by_isin,
+    prepare_data_by_ticker,
+    prepare_single_type,
+)
+
+
+def make_etf(wkn: str, editor: str, holdings: dict) -> ETFConfig:
+    df = pd.DataFrame(holdings).reindex(columns=NORMALIZED_COLUMNS)
+    return ETFConfig(
+        wkn, editor, None, pathlib.Path(f"{wkn}.csv"), df, df["Wert"].sum()
+    )
+
+
+def make_inputs() -> tuple[ETFHandler, pd.DataFrame, pd.DataFrame]:
+    ishares = make_etf(
+        "A2DVB9",
+        "iShares",
+        {
+            "Emittententicker": ["AAPL", None, "SAP", "MSFT"],
+            "Name": ["APPLE INC", "EUR CASH", "SAP SE", "MICROSOFT CORP"],
+            "Sektor": ["IT", "Cash und/oder Derivate", "IT", "IT"],
+            "Standort": [
+                "Vereinigte Staaten",
+                "Europäische Union",
+                "Deutschland",
+                "Vereinigte Staaten",
+            ],
+            "Wert": [60.0, 10.0, 30.0, 0.0],
+        },
+    )
+    amundi = make_etf(
+        "A2JSDC",
+        "amundi",
+        {
+            "ISIN": ["DE0007164600", "US0378331005", None],
+            "Name": ["SAP SE", "APPLE INC", "Cash"],
+            # The ETF disagrees with iShares on the Sektor of SAP
+            "Sektor": ["Software", np.nan, np.nan],
+            "Standort": ["Deutschland", np.nan, np.nan],
+            "Wert": [20.0, 40.0, 5.0],
+        },
+    )
+    ex_isin_info = pd.DataFrame(
+        {
+            "ISIN": ["DE0007164600", "US0378331005"],
+            "Symbol": ["SAP.DE", "AAPL"],
+            "Sektor": ["Technology", "Technology"],
+            "Standort": ["Germany", "United States"],
+            "Name": ["SAP SE", "APPLE INC"],
+        }
+    )
+    ex_isin_info["Emittententicker"] = ex_isin_info["Symbol"].str.split(".").str[0]
+    depot = pd.DataFrame(
+        {
+            "wkn": ["A2DVB9", "A2JSDC", "716460", "BTC"],
+            "info": ["iShares MSCI World SRI", "Amundi MSCI Europe", "SAP", "Bitcoin"],
+            "type": ["etf", "etf", "aktie", "krypto"],
+            "ticker": ["2B7K.DE", "CEU2.DE", "SAP.DE", "BTC-EUR"],
+            "Sektor": [np.nan, np.nan, "Technology", np.nan],
+            "Standort": [np.nan, np.nan, "Germany", np.nan],
+            "Wert": [100.0, 65.0, 50.0, 25.0],
+        }
+    )
+    return ETFHandler([ishares, amundi]), ex_isin_info, depot
+
+
+def merge_depot(
+    etf_handler: ETFHandler, ex_isin_info: pd.DataFrame, depot: pd.DataFrame
+) -> pd.DataFrame:
+    # Same steps as main
+    merge_cols = ["Emittententicker", "Standort"]
+    isin_merged = merge_holdings_by_isin(
+        [etf.zusammensetzung for etf in etf_handler.by_merge_key("ISIN")]
+    )
+    isin_merged["ISIN"] = isin_merged["ISIN"].fillna(isin_merged["Name"])
+    merged_isin = prepare_data_by_isin(isin_merged, ex_isin_info, merge_cols)
+    ticker_merged = merge_holdings_by_ticker(
+        [etf.zusammensetzung for etf in etf_handler.by_merge_key("Emittententicker")]
+    )
+    merged_df = prepare_data_by_ticker(
+        ticker_merged.merge(merged_isin, on=merge_cols, how="outer")
+    )
+    return pd.concat(
+        [
+            merged_df,
+            prepare_single_type(depot, "aktie"),
+            prepare_single_type(depot, "krypto"),
+        ]
+    )
+
+
+def test_attribution_index_keys():
+    etf_handler, ex_isin_info, depot = make_inputs()
+    depot_merged = merge_depot(etf_handler, ex_isin_info, depot)
+
+    index = build_attribution_index(etf_handler, ex_isin_info, depot, depot_merged)
+    by_key = index.set_index(["Emittententicker", "wkn"])
+
+    assert index.columns.tolist() == ATTRIBUTION_COLUMNS
+    # iShares holdings are keyed by ticker, falling back to the name
+    assert by_key.loc[("EUR-CASH", "A2DVB9"), "Wert"] == 10.0
+    # Holdings with ISIN get the Yahoo ticker and the mapped Standort
+    apple = by_key.loc[("AAPL", "A2JSDC")]
+    assert (apple["Standort"], apple["Wert"]) == ("Vereinigte Staaten", 40.0)
+    assert by_key.loc[("Cash", "A2JSDC"), "Wert"] == 5.0
+    # The Sektor of depot_merged wins over the one of the ETF
+    assert by_key.loc[("SAP", "A2JSDC"), "Sektor"] == "IT"
+    assert "MSFT" not in index["Emittententicker"].values
+
+
+def test_attribution_index_direct_positions():
+    etf_handler, ex_isin_info, depot = make_inputs()
+
+    index = build_attribution_index(etf_handler, ex_isin_info, depot)
+    direct = index[index["Type"] != "ETF"].set_index("wkn")
+
+    assert direct["Emittententicker"].to_dict() == {"716460": "SAP", "BTC": "BTC-EUR"}
+    assert direct.loc["716460", "Sektor"] == "IT"
+    assert direct.loc["716460", "Standort"] == "Deutschland"
+    assert direct["Position"].to_dict() == {"716460": "SAP", "BTC": "Bitcoin"}
+
+
+def test_attribution_index_matches_depot_merged():
+    etf_handler, ex_isin_info, depot = make_inputs()
+    depot_merged = merge_depot(etf_handler, ex_isin_info, depot)
+
+    index = build_attribution_index(etf_handler, ex_isin_info, depot, depot_merged)
+
+    assert (index["Wert"] != 0).all()
+    assert index["Wert"].sum() == depot_merged["Wert"].sum() == 240.0
+    keys = ["Emittententicker", "Standort", "Type"]
+    by_security = index.groupby(keys, dropna=False)["Wert"].sum()
+    merged = depot_merged.groupby(keys, dropna=False)["Wert"].sum()
+    pd.testing.assert_series_equal(
+        by_security, merged[merged != 0], check_dtype=False
+    )
+
+
+def test_write_attribution_index(tmp_path):
+    etf_handler, ex_isin_info, depot = make_inputs()
+    index = build_attribution_index(etf_handler, ex_isin_info, depot)
+    path = tmp_path / "depot_attribution.csv"
+
+    write_attribution_index(index, path)
+    written = pd.read_csv(path)
+
+    assert written.columns.tolist() == ATTRIBUTION_COLUMNS
+    assert len(written) == len(index)
+    assert written["Emittententicker"].is_monotonic_increasing
+    assert written["Wert"].sum() == index["Wert"].sum()
@@ -0,0 +1,81 @@
+import dataclasses
+
+import pandas as pd
+import pytest
+
+from depot_risk_assessment.mapping import sector_mapping
+from depot_risk_assessment.readers import NORMALIZED_COLUMNS, get_reader, to_float
+from depot_risk_assessment.transform_etfs import (
+    merge_holdings_by_isin,
+    merge_holdings_by_ticker,
+)
+
+
+def test_to_float_german_percent():
+    col = pd.Series(["1,23%", "0,5", " 12,00 %", None])
+    result = to_float(col)
+    assert result[:3].tolist() == [1.23, 0.5, 12.0]
+    assert pd.isna(result[3])
+
+
+def test_to_float_keeps_decimal_point_without_thousands():
+    assert to_float(pd.Series(["0.50"]), decimal=".").tolist() == [0.5]
+
+
+@pytest.mark.parametrize("value", ["<0,01%", "-", "1.234,5"])
+def test_to_float_raises_on_unparsable(value):
+    with pytest.raises(ValueError, match="1 values of Gewichtung"):
+        to_float(pd.Series(["1,0%", value, ""], name="Gewichtung"))
+
+
+def test_to_float_thousands():
+    col = pd.Series(["1.234,5"])
+    assert to_float(col, decimal=",", thousands=".").tolist() == [1234.5]
+
+
+def test_amundi_reader_streams_chunks(tmp_path):
+    path = tmp_path / "amundi.csv"
+    header = "\n" * 19
+    rows = [
+        ";ISIN;Name;Anlageklasse;Sektor;Land;Gewichtung",
+        ";DE0007164600;SAP SE;Aktien;Informationstechnologie;Deutschland;60,00%",
+        ";;;Cash;;;20,00%",
+        ";DE0008404005;Allianz;Aktien;Finanzdienstleistungen;Deutschland;20,00%",
+        ";DE000BASF111;BASF;Aktien;Werkstoffe;Deutschland;0,00%",
+        ";;;;;;",
+    ]
+    path.write_text(header + "\n".join(rows) + "\n", encoding="utf-8")
+    reader = dataclasses.replace(get_reader("amundi"), chunksize=2)
+
+    df = reader.read(path, 1000.0, sector_mapping)
+
+    assert df.columns.tolist() == NORMALIZED_COLUMNS
+    assert df["Name"].tolist() == ["SAP SE", "Cash", "Allianz"]
+    assert df["Sektor"].tolist()[::2] == ["IT", "Financials"]
+    assert df["Wert"].tolist() == [600.0, 200.0, 200.0]
+
+
+def test_reader_rejects_unknown_merge_key():
+    with pytest.raises(ValueError, match="Merge key"):
+        dataclasses.replace(get_reader("amundi"), merge_key="Name")
+
+
+def test_merge_holdings_by_isin_sums_across_etfs():
+    first = pd.DataFrame(
+        {"ISIN": ["DE0007164600", None], "Name": ["SAP SE", "Cash"], "Wert": [6, 2]}
+    )
+    second = pd.DataFrame(
+        {"ISIN": ["DE0007164600", None], "Name": ["SAP", "Cash"], "Wert": [4, 1]}
+    )
+
+    df = merge_holdings_by_isin([first.reindex(columns=NORMALIZED_COLUMNS), second])
+
+    assert df["Name"].tolist() == ["SAP SE", "Cash"]
+    assert df["Wert"].tolist() == [10, 3]
+
+
+def test_merge_holdings_by_ticker_without_etfs():
+    df = merge_holdings_by_ticker([])
+
+    assert df.empty
+    assert "Wert" in df.columns
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from depot_risk_assessment.rebalance import Band, Exposure, rebalance, solve_qp
+
+
+@pytest.fixture
+def exposure() -> Exposure:
+    attribution = pd.DataFrame(
+        {
+            "Emittententicker": ["NVDA", "AAPL", "SAP", "NVDA", "BTC", "SAP", "NESN"],
+            "Sektor": ["IT", "IT", "IT", "IT", None, "IT", "Konsum"],
+            "Standort": ["USA", "USA", "DE", "USA", None, "DE", "CH"],
+            "wkn": ["E1", "E1", "E1", "E2", "K1", "A1", "E3"],
+            "Position": ["World", "World", "World", "IT", "BTC", "SAP", "Europe"],
+            "Type": ["ETF", "ETF", "ETF", "ETF", "krypto", "aktie", "ETF"],
+            "Wert": [300.0, 200.0, 100.0, 500.0, 200.0, 300.0, 400.0],
+        }
+    )
+    return Exposure.from_attribution(attribution)
+
+
+@pytest.fixture
+def large_exposure() -> Exposure:
+    rng = np.random.default_rng(0)
+    n_rows = 20000
+    attribution = pd.DataFrame(
+        {
+            "Emittententicker": rng.integers(0, 5000, n_rows).astype(str),
+            "Sektor": rng.choice(["IT", "Financials", "Industrie"], n_rows),
+            "Standort": rng.choice(["USA", "Deutschland", "Japan"], n_rows),
+            "wkn": rng.integers(0, 40, n_rows).astype(str),
+            "Type": "ETF",
+            "Wert": rng.random(n_rows) * 40,
+        }
+    )
+    attribution["Position"] = attribution["wkn"]
+    return Exposure.from_attribution(attribution)
+
+
+@pytest.fixture
+def small_exposure() -> Exposure:
+    rng = np.random.default_rng(0)
+    n_rows = 400
+    attribution = pd.DataFrame(
+        {
+            "Emittententicker": rng.integers(0, 100, n_rows).astype(str),
+            "Sektor": rng.choice(["IT", "Financials", "Industrie"], n_rows),
+            "Standort": rng.choice(["USA", "Deutschland"], n_rows),
+            "wkn": rng.integers(0, 20, n_rows).astype(str),
+            "Type": "ETF",
+            "Wert": rng.random(n_rows),
+        }
+    )
+    # 20 positions worth 5000 euros in total
+    attribution["Wert"] *= 5000 / attribution["Wert"].sum()
+    attribution["Position"] = attribution["wkn"]
+    return Exposure.from_attribution(attribution)
+
+
+def trades_of(result) -> np.ndarray:
+    return result.trades["Trade"].to_numpy()
+
+
+def assert_bands_hold(result) -> None:
+    exposures = result.exposures
+    assert (exposures["Nachher"] <= exposures["upper"]).all()
+    assert (exposures["Nachher"] >= exposures["lower"]).all()
+
+
+def test_solve_qp_projection():
+    # min 1/2 |x|^2 s.t. x0 + x1 = 1, x0 <= 0.2
+    A = np.array([[1.0, 1.0], [1.0, 0.0]])
+    x, converged = solve_qp(
+        np.eye(2), np.zeros(2), A, np.array([1.0, -np.inf]), np.array([1.0, 0.2])
+    )
+    assert converged
+    np.testing.assert_allclose(x, [0.2, 0.8], atol=1e-4)
+
+
+def test_exposure_splits_ticker_over_standorte():
+    attribution = pd.DataFrame(
+        {
+            "Emittententicker": ["X", "X"],
+            "Sektor": ["IT", "IT"],
+            "Standort": ["USA", "Irland"],
+            "wkn": ["E1", "E1"],
+            "Position": "World",
+            "Type": "ETF",
+            "Wert": [30.0, 70.0],
+        }
+    )
+    weights = Exposure.from_attribution(attribution).weights["E1"]
+    assert weights[("Standort", "USA")] == pytest.approx(0.3)
+    assert weights[("Standort", "Irland")] == pytest.approx(0.7)
+
+
+def test_rebalance_with_selling(exposure):
+    bands = [Band("Sektor", "IT", upper=0.4), Band("Standort", "USA", upper=0.3)]
+    result = rebalance(exposure, bands)
+    assert result.converged
+    assert_bands_hold(result)
+    assert abs(trades_of(result).sum()) <= len(trades_of(result))
+
+
+def test_rebalance_without_selling(exposure):
+    bands = [Band("Sektor", "IT", upper=0.4)]
+    result = rebalance(exposure, bands, cash=None, allow_selling=False)
+    assert result.converged
+    assert_bands_hold(result)
+    assert (trades_of(result) >= 0).all()
+
+
+def test_rebalance_min_trade(exposure):
+    bands = [Band("Sektor", "IT", lower=0.75)]
+    result = rebalance(exposure, bands, min_trade=200)
+    assert result.converged
+    assert_bands_hold(result)
+    traded = trades_of(result)[trades_of(result) != 0]
+    assert (np.abs(traded) >= 199).all()
+
+
+def test_rebalance_infeasible(exposure):
+    bands = [Band("Sektor", "IT", upper=0.4)]
+    result = rebalance(exposure, bands, allow_selling=False)
+    assert not result.converged
+
+
+def test_rebalance_large_without_selling(large_exposure):
+    it_share = large_exposure.shares(large_exposure.values)[("Sektor", "IT")]
+    bands = [Band("Sektor", "IT", upper=it_share - 0.01)]
+    result = rebalance(
+        large_exposure, bands, cash=None, allow_selling=False, min_trade=500
+    )
+    trades = trades_of(result)
+    assert result.converged
+    assert_bands_hold(result)
+    assert (trades >= 0).all()
+    assert (trades[trades != 0] >= 499).all()
+
+
+def test_rebalance_small_depot_reaches_band(small_exposure):
+    it_share = small_exposure.shares(small_exposure.values)[("Sektor", "IT")]
+    upper = it_share - 0.02
+    result = rebalance(small_exposure, [Band("Sektor", "IT", upper=upper)])
+    assert result.converged
+    assert_bands_hold(result)
+    # The margin does not grow for small depots, no trading beyond the band
+    assert result.exposures["Nachher"].iloc[0] > upper - 0.001
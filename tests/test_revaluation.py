@@ -0,0 +1,101 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from depot_risk_assessment import revaluation
+from depot_risk_assessment.rebalance import Exposure
+from depot_risk_assessment.revaluation import (
+    ReplayPriceFeed,
+    Revaluator,
+    YahooPriceFeed,
+)
+
+EVAL_DATE = "06.11.2024"
+
+
+def make_attribution() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Emittententicker": ["NVDA", "SAP", "SAP", "NESN"],
+            "Sektor": ["IT", "IT", "IT", "Konsum"],
+            "Standort": ["USA", "Deutschland", "Deutschland", "Schweiz"],
+            "wkn": ["E1", "E1", "A1", "E2"],
+            "Position": ["World", "World", "SAP SE", "Europe"],
+            "Type": ["ETF", "ETF", "aktie", "ETF"],
+            "Wert": [300.0, 100.0, 300.0, 400.0],
+        }
+    )
+
+
+@pytest.fixture
+def revaluator() -> Revaluator:
+    depot = pd.DataFrame(
+        {
+            "wkn": ["E1", "A1", "E2"],
+            "ticker": ["EUNL.DE", "SAP.DE", "EXSA.DE"],
+            EVAL_DATE: [4.0, 2.0, 10.0],
+        }
+    )
+    exposure = Exposure.from_attribution(make_attribution())
+    return Revaluator.from_exposure(exposure, depot, EVAL_DATE)
+
+
+class FailingFeed:
+    async def stream(self):
+        yield {"SAP.DE": 200.0}
+        raise ConnectionError("feed lost")
+
+
+def percentages(snapshot: pd.DataFrame) -> dict:
+    return snapshot.set_index(["dimension", "group"])["Percentage"].round(2).to_dict()
+
+
+def test_apply_updates_only_changed_positions(revaluator):
+    assert revaluator.apply({"SAP.DE": 300.0})
+    assert revaluator.total == pytest.approx(1400.0)
+    snapshot = percentages(revaluator.snapshot())
+    assert snapshot[("Sektor", "IT")] == pytest.approx(1000 / 1400 * 100, abs=0.01)
+    assert snapshot[("Standort", "Schweiz")] == pytest.approx(
+        400 / 1400 * 100, abs=0.01
+    )
+
+
+def test_from_exposure_drops_positions_missing_in_depot(caplog):
+    depot = pd.DataFrame(
+        {"wkn": ["E1", "A1"], "ticker": ["EUNL.DE", "SAP.DE"], EVAL_DATE: [4.0, 0.0]}
+    )
+    exposure = Exposure.from_attribution(make_attribution())
+
+    revaluator = Revaluator.from_exposure(exposure, depot, EVAL_DATE)
+
+    assert revaluator.tickers.tolist() == ["EUNL.DE"]
+    assert revaluator.total == pytest.approx(400.0)
+    assert percentages(revaluator.snapshot())[("Standort", "USA")] == 75.0
+    assert "['A1', 'E2']" in caplog.text
+
+
+def test_run_skips_unknown_tickers(revaluator):
+    published = []
+    feed = ReplayPriceFeed([{"UNKNOWN": 1.0}, {"SAP.DE": 300.0}])
+    asyncio.run(revaluator.run(feed, published.append))
+    assert len(published) == 1
+
+
+def test_run_reraises_feed_errors(revaluator):
+    published = []
+    with pytest.raises(ConnectionError):
+        asyncio.run(
+            asyncio.wait_for(revaluator.run(FailingFeed(), published.append), 5)
+        )
+    assert len(published) == 1
+
+
+def test_yahoo_feed_drops_invalid_prices(monkeypatch):
+    prices = {"SAP.DE": 210.0, "GONE.DE": None, "ZERO.DE": 0.0, "NAN.DE": float("nan")}
+    monkeypatch.setattr(revaluation, "get_live_price_for", prices.get)
+
+    async def first_tick() -> dict[str, float]:
+        return await anext(YahooPriceFeed(list(prices), interval=0).stream())
+
+    assert asyncio.run(first_tick()) == {"SAP.DE": 210.0}
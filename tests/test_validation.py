@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from depot_risk_assessment.validation import Reconciler, ReconciliationError
+
+
+def make_reconciler(policy: str) -> Reconciler:
+    reconciler = Reconciler(policy)
+    reconciler.set_reference(
+        pd.DataFrame({"editor": ["amundi", "iShares"], "Wert": [100.0, 50.0]})
+    )
+    return reconciler
+
+
+def test_fail_fast_raises_on_add():
+    reconciler = make_reconciler("fail_fast")
+    reconciler.add(
+        "editor_merged", pd.DataFrame({"Wert": [60.0, 40.0]}), ["amundi"], 0.2
+    )
+    with pytest.raises(ReconciliationError) as error:
+        reconciler.add(
+            "editor_merged", pd.DataFrame({"Wert": [10.0]}), ["iShares"], 0.2
+        )
+    assert error.value.report.issues["scope"].tolist() == ["iShares"]
+
+
+def test_fail_reports_all_issues_on_run():
+    reconciler = make_reconciler("fail")
+    reconciler.add(
+        "editor_merged",
+        pd.DataFrame({"ISIN": ["A", "A"], "Wert": [60.0, 30.0]}),
+        ["amundi"],
+        0.2,
+        keys=["ISIN"],
+    )
+    reconciler.add(
+        "editor_merged",
+        pd.DataFrame({"Standort": [None], "Wert": [50.0]}),
+        ["iShares"],
+        0.2,
+        required=["Standort"],
+    )
+    with pytest.raises(ReconciliationError) as error:
+        reconciler.run()
+    assert sorted(error.value.report.issues["check"]) == [
+        "duplicated",
+        "missing_Standort",
+        "value_conservation",
+    ]
+
+
+def test_warn_returns_report_and_checks_against_stage():
+    reconciler = make_reconciler("warn")
+    reconciler.add("editor_merged", pd.DataFrame({"Wert": [100.0]}), ["amundi"], 0.2)
+    reconciler.add("editor_merged", pd.DataFrame({"Wert": [50.0]}), ["iShares"], 0.2)
+    reconciler.add(
+        "merged",
+        pd.DataFrame({"Wert": [140.0]}),
+        ["amundi", "iShares"],
+        1,
+        against="editor_merged",
+    )
+    report = reconciler.run()
+    assert not report.ok
+    assert report.issues[["stage", "expected"]].values.tolist() == [["merged", 150.0]]